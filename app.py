@@ -2,8 +2,16 @@ import streamlit as st
 import pandas as pd
 import requests
 import json
+import hashlib
 from datetime import datetime, timedelta
 import math
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import numpy as np
 
 # Authentication configuration
 USERNAME = "admin"
@@ -48,8 +56,11 @@ if not check_password():
 # Page config (after authentication)
 st.set_page_config(page_title="Sales Engagement Dashboard", layout="wide")
 
-# API configuration
-API_URL = "https://elastic.snaplogic.com/api/1/rest/slsched/feed/SLoS_Prod/Echo_Sales_Coach/Echo_Sales_Coach/engagement_api"
+# API configuration (ENGAGEMENT_API_URL points the dashboard at another feed, e.g. the load test stub)
+API_URL = os.environ.get(
+    "ENGAGEMENT_API_URL",
+    "https://elastic.snaplogic.com/api/1/rest/slsched/feed/SLoS_Prod/Echo_Sales_Coach/Echo_Sales_Coach/engagement_api"
+)
 API_HEADERS = {
     "Authorization": "Bearer 12345",
     "Content-Type": "application/json"
@@ -138,6 +149,10 @@ def get_data():
         if 'created_at' in df.columns:
             df['created_at'] = pd.to_datetime(df['created_at'])
         
+        # Sync the engagement index with every successful load
+        with st.spinner("Indexing engagements..."):
+            get_engagement_index().sync(df)
+        
         return df
         
     except requests.exceptions.Timeout:
@@ -223,6 +238,355 @@ def extract_all_snaplogic_participants(df):
     
     return snaplogic_participants
 
+# Engagement index configuration, shared by similar-engagement lookup and mention trends
+SIMILARITY_FIELDS = ['current_state_analysis', 'deal_risks', 'business_drivers', 'use_cases']
+SIMILARITY_QUERY_TERMS = 50
+SIMILARITY_SHORTLIST = 50
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from
+further had has have having he her here hers him his how i if in into is it its itself
+just like me more most my no nor not now of off on once only or other our ours out over
+own really same she should so some such than that the their theirs them then there these
+they this those through to too under until up us very was we were what when where which
+while who whom why will with would yeah yes you your yours okay ok um uh
+""".split())
+
+def tokenize(text):
+    """Split text into lowercase terms, dropping stop words and single characters"""
+    return [
+        term for term in TOKEN_PATTERN.findall(str(text).lower())
+        if len(term) > 1 and term not in STOP_WORDS
+    ]
+
+def collect_text(value):
+    """Flatten nested qualification data into a list of strings"""
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in collect_text(item)]
+    if isinstance(value, list):
+        return [text for item in value for text in collect_text(item)]
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+def content_hash(row):
+    """Hash the fields an engagement is indexed on, to detect changes between syncs"""
+    content = [row.get(field) for field in ('qualification_data', 'transcript', 'external_company', 'call_owner', 'engagement_type', 'created_at')]
+    return hashlib.md5(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def engagement_terms(row):
+    """Tokenize an engagement once, returns (similarity term counts, extra mention term counts, token lists).
+
+    Similarity terms come from SIMILARITY_FIELDS and the transcript. Mention
+    counts add the words of every other qualification field, so keyword
+    trends cover the full qualification data. The token lists, one per text,
+    are kept so multi-word keywords can be matched as phrases.
+    """
+    qual_data = safe_get_dict(row.get('qualification_data', {}))
+    similarity_parts = []
+    mention_parts = []
+    for field, value in qual_data.items():
+        (similarity_parts if field in SIMILARITY_FIELDS else mention_parts).extend(collect_text(value))
+    transcript = row.get('transcript', '')
+    if isinstance(transcript, str) and transcript:
+        similarity_parts.append(transcript)
+    similarity_tokens = [tokenize(text) for text in similarity_parts]
+    mention_tokens = [tokenize(text) for text in mention_parts]
+    similarity_terms = Counter(term for tokens in similarity_tokens for term in tokens)
+    mention_terms = Counter(term for tokens in mention_tokens for term in tokens)
+    return similarity_terms, mention_terms, similarity_tokens + mention_tokens
+
+class EngagementIndex:
+    """Incremental inverted index over engagement text, serving two independent queries.
+
+    Engagements are tokenized once when they first arrive. Each engagement keeps
+    a content hash, so one whose qualification data or transcript changes is
+    removed and indexed again. Removed engagements leave an empty slot until the
+    index is compacted.
+
+    most_similar scores cosine similarities of log-TF-IDF vectors over
+    SIMILARITY_FIELDS and the transcript, with IDF and document norms
+    recomputed once per index version. mention_counts counts keywords over the
+    transcript and all qualification fields: the similarity postings plus
+    separate mention postings for the remaining fields, and each engagement's
+    token sequence kept as term ids for matching multi-word keywords. Mention
+    counts use raw term counts only and do not depend on similarity scoring.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0         # bumped whenever indexed content changes
+        self.vocabulary = {}     # term -> term id
+        self.postings = []       # term id -> (array of docs, array of counts), docs ascending
+        self.doc_ids = []        # doc -> engagement_id, None once removed
+        self.doc_lookup = {}     # engagement_id -> doc
+        self.doc_hashes = {}     # engagement_id -> content hash
+        self.doc_terms = []      # doc -> (term ids, term counts)
+        self.mention_postings = []    # term id -> (array of docs, array of counts), mention-only fields
+        self.doc_mention_terms = []   # doc -> (mention term ids, term counts)
+        self.doc_sequences = []       # doc -> term ids in text order, -1 between texts
+        self.doc_meta = []       # doc -> display fields, None once removed
+        self._weights = None     # (version, idf per term, TF-IDF norm per doc)
+        self._posting_cache = {} # term id -> (docs, log term frequencies) as arrays, for the current version
+
+    def __len__(self):
+        return len(self.doc_lookup)
+
+    def sync(self, df):
+        """Bring the index in line with df, returns how many engagements were (re)indexed.
+
+        New and changed engagements are tokenized outside the lock so lookups
+        from other sessions are not blocked, and engagements missing from df
+        are dropped.
+        """
+        if df.empty or 'engagement_id' not in df.columns:
+            return 0
+        rows = df[df['engagement_id'].notna()].drop_duplicates('engagement_id', keep='last')
+        changed = []
+        for row in rows.to_dict('records'):
+            row_hash = content_hash(row)
+            if self.doc_hashes.get(row['engagement_id']) != row_hash:
+                changed.append((row, row_hash, engagement_terms(row)))
+
+        current_ids = set(rows['engagement_id'])
+        with self.lock:
+            removed = [engagement_id for engagement_id in self.doc_lookup if engagement_id not in current_ids]
+            for engagement_id in removed:
+                self._remove(engagement_id)
+            for row, row_hash, terms in changed:
+                if row['engagement_id'] in self.doc_lookup:
+                    self._remove(row['engagement_id'])
+                self._add(row, row_hash, *terms)
+            if removed or changed:
+                self.version += 1
+                self._posting_cache = {}
+            if len(self.doc_ids) > 2 * len(self.doc_lookup):
+                self._compact()
+        return len(changed)
+
+    def _add(self, row, row_hash, counts, mention_counts, token_lists):
+        doc = len(self.doc_ids)
+        self.doc_ids.append(row['engagement_id'])
+        self.doc_lookup[row['engagement_id']] = doc
+        self.doc_hashes[row['engagement_id']] = row_hash
+        self.doc_meta.append({
+            'engagement_id': row['engagement_id'],
+            'external_company': row.get('external_company'),
+            'call_owner': row.get('call_owner'),
+            'engagement_type': row.get('engagement_type'),
+            'created_at': row.get('created_at'),
+        })
+
+        self.doc_terms.append(self._add_postings(self.postings, counts, doc))
+        self.doc_mention_terms.append(self._add_postings(self.mention_postings, mention_counts, doc))
+        sequence = array('i')
+        for tokens in token_lists:
+            sequence.extend(map(self.vocabulary.__getitem__, tokens))
+            sequence.append(-1)
+        self.doc_sequences.append(np.array(sequence, dtype=np.int32))
+
+    def _add_postings(self, postings, counts, doc):
+        term_ids = []
+        for term, count in counts.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = self.vocabulary[term] = len(self.postings)
+                self.postings.append((array('i'), array('i')))
+                self.mention_postings.append((array('i'), array('i')))
+            docs, doc_counts = postings[term_id]
+            docs.append(doc)
+            doc_counts.append(count)
+            term_ids.append(term_id)
+        return np.array(term_ids, dtype=np.int32), np.array(list(counts.values()), dtype=np.int32)
+
+    def _remove(self, engagement_id):
+        doc = self.doc_lookup.pop(engagement_id)
+        del self.doc_hashes[engagement_id]
+        for postings, (term_ids, _) in ((self.postings, self.doc_terms[doc]), (self.mention_postings, self.doc_mention_terms[doc])):
+            for term_id in term_ids.tolist():
+                docs, doc_counts = postings[term_id]
+                position = bisect_left(docs, doc)
+                del docs[position]
+                del doc_counts[position]
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+        self.doc_ids[doc] = None
+        self.doc_meta[doc] = None
+        self.doc_terms[doc] = empty
+        self.doc_mention_terms[doc] = empty
+        self.doc_sequences[doc] = empty[0]
+
+    def _compact(self):
+        # Renumber the remaining engagements and rebuild postings from their stored term counts
+        live = [doc for doc, engagement_id in enumerate(self.doc_ids) if engagement_id is not None]
+        self.doc_ids = [self.doc_ids[doc] for doc in live]
+        self.doc_terms = [self.doc_terms[doc] for doc in live]
+        self.doc_mention_terms = [self.doc_mention_terms[doc] for doc in live]
+        self.doc_sequences = [self.doc_sequences[doc] for doc in live]
+        self.doc_meta = [self.doc_meta[doc] for doc in live]
+        self.doc_lookup = {engagement_id: doc for doc, engagement_id in enumerate(self.doc_ids)}
+        self.postings = [(array('i'), array('i')) for _ in self.postings]
+        self.mention_postings = [(array('i'), array('i')) for _ in self.mention_postings]
+        for postings, doc_terms in ((self.postings, self.doc_terms), (self.mention_postings, self.doc_mention_terms)):
+            for doc, (term_ids, term_counts) in enumerate(doc_terms):
+                for term_id, count in zip(term_ids.tolist(), term_counts.tolist()):
+                    docs, doc_counts = postings[term_id]
+                    docs.append(doc)
+                    doc_counts.append(count)
+
+    def _current_weights(self):
+        # IDF for every term and the TF-IDF norm of every doc, recomputed only when the index changes
+        if self._weights is None or self._weights[0] != self.version:
+            doc_freq = np.fromiter((len(docs) for docs, _ in self.postings), dtype=np.float64, count=len(self.postings))
+            idf = np.log((1 + len(self.doc_lookup)) / (1 + doc_freq)) + 1
+            sizes = [len(term_ids) for term_ids, _ in self.doc_terms]
+            if sum(sizes):
+                term_ids = np.concatenate([term_ids for term_ids, _ in self.doc_terms])
+                term_counts = np.concatenate([term_counts for _, term_counts in self.doc_terms])
+                weights = (1 + np.log(term_counts)) * idf[term_ids]
+                norms = np.sqrt(np.bincount(np.repeat(np.arange(len(sizes)), sizes), weights=weights ** 2, minlength=len(sizes)))
+            else:
+                norms = np.zeros(len(sizes))
+            norms[norms == 0] = np.inf
+            self._weights = (self.version, idf, norms)
+        return self._weights[1], self._weights[2]
+
+    def _posting_weights(self, term_id):
+        cached = self._posting_cache.get(term_id)
+        if cached is None:
+            docs, doc_counts = self.postings[term_id]
+            cached = (np.array(docs, dtype=np.intp), 1 + np.log(np.array(doc_counts, dtype=np.float64)))
+            self._posting_cache[term_id] = cached
+        return cached
+
+    def most_similar(self, engagement_id, k=5):
+        """Return up to k (score, metadata) pairs for the engagements closest to engagement_id"""
+        with self.lock:
+            doc = self.doc_lookup.get(engagement_id)
+            if doc is None:
+                return []
+            term_ids, term_counts = self.doc_terms[doc]
+            if not len(term_ids):
+                return []
+
+            idf, norms = self._current_weights()
+            query_weights = (1 + np.log(term_counts)) * idf[term_ids]
+            query_norm = np.linalg.norm(query_weights)
+
+            # Shortlist candidates using the most distinctive terms only, common words add cost but little signal
+            top_terms = np.arange(len(term_ids))
+            if len(term_ids) > SIMILARITY_QUERY_TERMS:
+                top_terms = np.argpartition(query_weights, -SIMILARITY_QUERY_TERMS)[-SIMILARITY_QUERY_TERMS:]
+            scores = np.zeros(len(self.doc_ids))
+            for term_id, weight in zip(term_ids[top_terms].tolist(), (query_weights * idf[term_ids])[top_terms].tolist()):
+                docs, log_counts = self._posting_weights(term_id)
+                scores[docs] += weight * log_counts
+            scores /= norms
+            scores[doc] = 0
+            candidates = np.flatnonzero(scores > 0)
+            shortlist = max(k, SIMILARITY_SHORTLIST)
+            if len(candidates) > shortlist:
+                candidates = candidates[np.argpartition(scores[candidates], -shortlist)[-shortlist:]]
+
+            # Exact cosine similarity over all terms for the shortlisted engagements
+            dense_query = np.zeros(len(idf))
+            dense_query[term_ids] = query_weights
+            similar = []
+            for candidate in candidates.tolist():
+                candidate_ids, candidate_counts = self.doc_terms[candidate]
+                dot = np.dot(dense_query[candidate_ids], (1 + np.log(candidate_counts)) * idf[candidate_ids])
+                similar.append((float(dot / (query_norm * norms[candidate])), self.doc_meta[candidate]))
+            similar.sort(key=lambda item: -item[0])
+            return similar[:k]
+
+    def _term_counts(self, postings, term_id):
+        counts = np.zeros(len(self.doc_ids), dtype=np.int32)
+        docs, doc_counts = postings[term_id]
+        counts[np.array(docs, dtype=np.intp)] = np.array(doc_counts, dtype=np.int32)
+        return counts
+
+    def _mention_counts(self, keyword):
+        terms = tokenize(keyword)
+        term_ids = [self.vocabulary.get(term) for term in terms]
+        counts = np.zeros(len(self.doc_ids), dtype=np.int32)
+        if not term_ids or None in term_ids:
+            return counts
+        if len(term_ids) == 1:
+            return self._term_counts(self.postings, term_ids[0]) + self._term_counts(self.mention_postings, term_ids[0])
+
+        # Match phrases against the token sequences of engagements that contain every word
+        candidates = None
+        for term_id in term_ids:
+            docs = np.union1d(np.array(self.postings[term_id][0]), np.array(self.mention_postings[term_id][0]))
+            candidates = docs if candidates is None else np.intersect1d(candidates, docs, assume_unique=True)
+        for doc in candidates.tolist():
+            sequence = self.doc_sequences[doc]
+            windows = len(sequence) - len(term_ids) + 1
+            match = np.ones(max(windows, 0), dtype=bool)
+            for offset, term_id in enumerate(term_ids):
+                match &= sequence[offset:offset + windows] == term_id
+            counts[doc] = match.sum()
+        return counts
+
+    def mention_counts(self, keywords):
+        """Return (metadata frame, counts) for indexed engagements, counts has one column per keyword.
+
+        Counts are kept apart from the metadata so keywords like 'week' cannot clash with its columns.
+        """
+        with self.lock:
+            live = [doc for doc, meta in enumerate(self.doc_meta) if meta is not None]
+            meta = pd.DataFrame([self.doc_meta[doc] for doc in live], columns=['engagement_id', 'external_company', 'call_owner', 'engagement_type', 'created_at'])
+            counts = np.zeros((len(live), len(keywords)), dtype=np.int32)
+            for column, keyword in enumerate(keywords):
+                counts[:, column] = self._mention_counts(keyword)[live]
+        return meta, counts
+
+@st.cache_resource
+def get_engagement_index():
+    """Shared engagement index, kept across reruns and sessions and synced whenever data is loaded"""
+    return EngagementIndex()
+
+@st.cache_data(ttl=300, max_entries=5000)
+def get_similar_engagements(_index, index_version, engagement_id, k=5):
+    """Cached similar-engagement lookup, index_version is part of the cache key so results refresh when the index changes"""
+    return _index.most_similar(engagement_id, k)
+
+@st.cache_data(ttl=300)
+def get_mention_trends(_index, index_version, keywords, group_by=None):
+    """Weekly mention counts per keyword, optionally split by 'Owner' or 'Platform'.
+
+    index_version is part of the cache key so results refresh when indexed engagements change.
+    """
+    keywords = list(keywords)
+    meta, counts = _index.mention_counts(keywords)
+    if meta.empty or not keywords:
+        return pd.DataFrame()
+
+    # Keyword columns are numbered rather than named, keyword text is mapped back after melting
+    frame = pd.DataFrame(counts)
+    frame['week'] = pd.to_datetime(meta['created_at'], utc=True).dt.tz_localize(None).dt.to_period('W').dt.start_time
+    id_vars = ['week']
+    if group_by == "Owner":
+        frame['group'] = meta['call_owner'].fillna('Unknown').astype(str).str.split('@').str[0]
+        id_vars.append('group')
+    elif group_by == "Platform":
+        frame['group'] = np.where(meta['engagement_type'] == 'dialer', "Outreach", "Chorus")
+        id_vars.append('group')
+
+    mentions = frame.melt(id_vars=id_vars, value_vars=list(range(len(keywords))), var_name='keyword', value_name='mentions')
+    mentions = mentions[(mentions['mentions'] > 0) & mentions['week'].notna()]
+    if mentions.empty:
+        return pd.DataFrame()
+    mentions['keyword'] = np.asarray(keywords, dtype=object)[mentions['keyword'].to_numpy(dtype=int)]
+    if group_by in ("Owner", "Platform"):
+        mentions['series'] = mentions['keyword'] + " (" + mentions['group'] + ")"
+    else:
+        mentions['series'] = mentions['keyword']
+
+    trends = mentions.groupby(['week', 'series'])['mentions'].sum().unstack(fill_value=0)
+    all_weeks = pd.date_range(trends.index.min(), trends.index.max(), freq='7D')
+    return trends.reindex(all_weeks, fill_value=0).rename_axis('week')
+
 def display_engagement_details(row):
     """Display detailed engagement information"""
     qual_data = safe_get_dict(row.get('qualification_data', {}))
@@ -445,6 +809,19 @@ def display_engagement_details(row):
                                 for req in use_case['technical_requirements']:
                                     st.write(f"  - {req}")
                             st.divider()
+    
+    # Similar Engagements
+    similar = get_similar_engagements(engagement_index, engagement_index.version, row.get('engagement_id'))
+    if similar:
+        st.markdown("---")
+        st.markdown("## Similar Engagements")
+        for score, meta in similar:
+            details = [get_platform_label(meta['engagement_type'])]
+            if pd.notna(meta['call_owner']):
+                details.append(str(meta['call_owner']).split('@')[0])
+            if pd.notna(meta['created_at']):
+                details.append(pd.to_datetime(meta['created_at']).strftime('%m/%d/%Y'))
+            st.write(f"• **{meta['external_company']}** ({', '.join(details)}) - similarity {score:.2f}")
 
 # Initialize session state
 if 'current_page' not in st.session_state:
@@ -460,6 +837,9 @@ if df.empty:
     st.error("No data available. Please check the API connection.")
     st.stop()
 
+# Engagement index for similar engagements and mention trends, synced by get_data
+engagement_index = get_engagement_index()
+
 # Get filter options
 snaplogic_participants_dict = extract_all_snaplogic_participants(df)
 snaplogic_participants = sorted(list(snaplogic_participants_dict.keys()))
@@ -470,6 +850,32 @@ st.title("Sales Engagement Dashboard")
 st.markdown("*Track and analyze sales conversations with AI-powered insights*")
 st.divider()
 
+# Mention trends across the full engagement history
+with st.expander("Mention Trends", expanded=False):
+    trend_col1, trend_col2 = st.columns([3, 1])
+    with trend_col1:
+        trend_keywords = st.text_input(
+            "Competitors or keywords (comma separated)",
+            placeholder="e.g. MuleSoft, Boomi, Informatica",
+            key="trend_keywords"
+        )
+    with trend_col2:
+        trend_group_by = st.selectbox("Split by", ["None", "Owner", "Platform"], key="trend_group_by")
+    
+    keywords = tuple(dict.fromkeys(k.strip() for k in trend_keywords.split(',') if k.strip()))
+    ignored = [k for k in keywords if not tokenize(k)]
+    if ignored:
+        st.caption(f"Ignored, only stop words or single characters: {', '.join(ignored)}")
+    keywords = tuple(k for k in keywords if k not in ignored)
+    if keywords:
+        trends = get_mention_trends(engagement_index, engagement_index.version, keywords, trend_group_by)
+        if trends.empty:
+            st.info("No mentions found for these keywords.")
+        else:
+            st.line_chart(trends)
+            st.caption(f"Mentions per week across {len(engagement_index)} engagements (transcripts and qualification data)")
+            st.dataframe(trends.sum().sort_values(ascending=False).rename("Total mentions"), use_container_width=True)
+
 # Sidebar filters
 with st.sidebar:
     # Add logout button at the top
@@ -552,6 +958,7 @@ with st.sidebar:
     
     with st.expander("API Status"):
         st.write(f"**Records loaded:** {len(df)}")
+        st.write(f"**Records indexed:** {len(engagement_index)}")
         st.write(f"**Last updated:** {datetime.now().strftime('%H:%M:%S')}")
 
 # Apply filters
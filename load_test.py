@@ -0,0 +1,369 @@
+"""Concurrent-session load test for the Sales Engagement Dashboard.
+
+Serves synthetic engagements from a local stub feed, points app.py at it via
+ENGAGEMENT_API_URL and drives N simulated sessions with Streamlit's AppTest.
+Each session logs in, changes filters, pages through results, triggers a plain
+rerun and queries mention trends. Sessions run
+in threads inside one process, like a single `streamlit run` server, so
+st.cache_data and st.cache_resource are shared between them.
+
+Reports p50/p95 rerun latency per interaction, overall throughput and the
+resident memory added per session.
+
+AppTest is not built for concurrent sessions, so share_runtime_between_sessions
+patches private Streamlit internals. Tested on Streamlit 1.66.0, the harness
+checks those internals up front and exits with a message if they have moved.
+
+Usage:
+    python load_test.py --sessions 10 --iterations 3 --engagements 500
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+TESTED_STREAMLIT_VERSION = "1.66.0"
+QUIET_LOGGERS = ("streamlit.deprecation_util", "streamlit.runtime.scriptrunner_utils.script_run_context")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# Login credentials, kept in sync with app.py
+USERNAME = "admin"
+PASSWORD = "snaplogic123"
+
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", "Cyberdyne"]
+OWNERS = ["alice@snaplogic.com", "bob@snaplogic.com", "carol@snaplogic.com", "dave@snaplogic.com"]
+COMPETITORS = ["MuleSoft", "Boomi", "Informatica", "Workato", "Fivetran"]
+PAINS = [
+    "manual data entry between Salesforce and NetSuite",
+    "brittle point-to-point integrations",
+    "slow onboarding of new SaaS applications",
+    "no visibility into failed data pipelines",
+    "legacy ETL jobs that take hours to run",
+]
+USE_CASES = ["Salesforce to Snowflake sync", "SAP migration", "HR onboarding automation", "API management", "data lake ingestion"]
+FILLER = "we talked about the roadmap timeline budget team integration pipeline api data cloud security".split()
+
+
+def make_engagement(i, rng, start):
+    """Build one synthetic engagement shaped like the production feed"""
+    company = rng.choice(COMPANIES)
+    owner = rng.choice(OWNERS)
+    owner_name = owner.split("@")[0].title()
+    has_opp = rng.random() < 0.6
+    transcript_words = rng.choices(FILLER + COMPETITORS + PAINS, k=rng.randint(200, 1500))
+    return {
+        "engagement_id": f"eng-{i}",
+        "engagement_type": rng.choice(["dialer", "meeting"]),
+        "external_company": company,
+        "call_owner": owner,
+        "created_at": (start + timedelta(hours=rng.randint(0, 24 * 180))).isoformat(),
+        "subject": f"{company} discovery call",
+        "opp_id": f"006{i:012d}" if has_opp else None,
+        "opp_name": f"{company} - Integration Platform" if has_opp else None,
+        "chorus_link": f"https://chorus.example.com/meeting/{i}",
+        "pdf_tool_analysis_url": f"https://coach.example.com/report/{i}.pdf",
+        "participants": [
+            {"name": owner_name, "company_name": "SnapLogic", "email": owner},
+            {"name": f"Contact {i % 50}", "company_name": company, "email": f"contact{i % 50}@example.com"},
+        ],
+        "qualification_data": {
+            "call_analysis": {"call_type": rng.choice(["Discovery", "Demo", "Negotiation"])},
+            "current_state_analysis": {
+                "current_state": rng.choice(PAINS),
+                "challenges_pain": rng.sample(PAINS, 2),
+                "desired_future_state": "a single integration platform",
+            },
+            "deal_risks": {
+                "competitive_threats": rng.sample(COMPETITORS, rng.randint(0, 2)),
+                "internal_obstacles": ["budget freeze"] if rng.random() < 0.3 else [],
+            },
+            "business_drivers": {
+                "what_is_driving_change": rng.choice(PAINS),
+                "desired_outcomes": ["faster onboarding", "fewer failed jobs"],
+            },
+            "use_cases": {
+                "use_case_1": {"description": rng.choice(USE_CASES), "frequency": "daily", "technical_requirements": ["REST", "OAuth"]},
+            },
+        },
+        "transcript": " ".join(transcript_words),
+    }
+
+
+def start_stub_feed(engagements):
+    """Serve engagements as JSON from a local HTTP server, returns (server, url)"""
+    payload = json.dumps(engagements).encode("utf-8")
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/engagement_api"
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, falls back to peak RSS off Linux"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def share_runtime_between_sessions():
+    """Let AppTest instances run concurrently in one process, like sessions on one server.
+
+    AppTest installs a mock Runtime singleton at the start of every run and
+    clears it at the end, so a run finishing on one thread would pull the
+    runtime out from under runs still in progress on others. Fall back to one
+    shared mock runtime whenever the singleton has been cleared. AppTest also
+    compiles the script afresh on every run, which is not thread safe in
+    CPython, so share one ScriptCache the way a real server does. Each run
+    also patches config.get_option to enable global.appTest and restores it
+    when done, which switches the option off under runs still in progress, so
+    enable it once for the whole process and make the per-run patch a no-op.
+
+    Returns the entered global.appTest patch, which the caller must keep a
+    reference to for as long as sessions run. Raises RuntimeError naming the
+    missing internals when the installed Streamlit no longer has them.
+    """
+    from contextlib import nullcontext
+    from unittest.mock import MagicMock
+
+    import streamlit
+    import streamlit.logger
+
+    def incompatible(detail):
+        return RuntimeError(
+            f"Streamlit {streamlit.__version__} is not supported by this harness "
+            f"(tested on {TESTED_STREAMLIT_VERSION}): {detail}"
+        )
+
+    try:
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import app_test, local_script_runner
+    except ImportError as e:
+        raise incompatible(str(e)) from e
+    required = [
+        (Runtime, "_instance"), (Runtime, "instance"), (Runtime, "exists"),
+        (app_test, "ScriptCache"), (local_script_runner, "ScriptCache"),
+        (app_test, "patch_config_options"),
+    ]
+    missing = [f"{getattr(owner, '__name__', owner)}.{name}" for owner, name in required if not hasattr(owner, name)]
+    if missing:
+        raise incompatible(f"missing {', '.join(missing)}")
+
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    app_test_config = app_test.patch_config_options({"global.appTest": True})
+    app_test_config.__enter__()
+    app_test.patch_config_options = lambda overrides: nullcontext()
+
+    # Keep per-rerun deprecation and bare-mode warnings from drowning out the report
+    for name in QUIET_LOGGERS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            print(f"Note: {name} not found in Streamlit {streamlit.__version__}, its warnings will not be silenced")
+            continue
+        streamlit.logger.get_logger(name).disabled = True
+    return app_test_config
+
+
+class Session:
+    """One simulated user driving the dashboard through AppTest"""
+
+    def __init__(self, session_id, timeout, rng):
+        from streamlit.testing.v1 import AppTest
+
+        self.session_id = session_id
+        self.rng = rng
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.errors = []
+
+    def _rerun(self, action, interaction=None):
+        # Failed reruns are counted apart so they never feed the latency percentiles
+        started = time.perf_counter()
+        try:
+            (interaction() if interaction else self.app).run()
+        except Exception as e:
+            self.failures[action] += 1
+            self.errors.append(f"{action}: {e}")
+            return
+        if self.app.exception:
+            self.failures[action] += 1
+            self.errors.append(f"{action}: {self.app.exception[0].message}")
+            return
+        self.latencies[action].append(time.perf_counter() - started)
+
+    def _sidebar_selectbox(self, label):
+        return next(s for s in self.app.sidebar.selectbox if s.label.startswith(label))
+
+    def _button(self, label):
+        return next((b for b in self.app.button if b.label == label), None)
+
+    def login(self):
+        self._rerun("initial load")
+        self.app.text_input[0].input(USERNAME)
+        self.app.text_input[1].input(PASSWORD)
+        self._rerun("login", self.app.button[0].click)
+
+    def browse(self):
+        """One pass of filter changes, paging, a plain rerun and a trend query"""
+        platform = self._sidebar_selectbox("Platform")
+        self._rerun("filter change", lambda: platform.select(self.rng.choice(platform.options)))
+
+        participant = self._sidebar_selectbox("SnapLogic Participant")
+        self._rerun("filter change", lambda: participant.select(self.rng.choice(participant.options)))
+
+        search = next(t for t in self.app.sidebar.text_input if t.label.startswith("Search"))
+        self._rerun("filter change", lambda: search.input(self.rng.choice(["", "", "Acme", "alice"])))
+
+        for _ in range(2):
+            next_button = self._button("Next")
+            if next_button is None or next_button.disabled:
+                break
+            self._rerun("paging", next_button.click)
+
+        # AppTest cannot open expanders or click download buttons. Opening an
+        # engagement is browser-only, and a download click costs one rerun with
+        # unchanged widgets, which is what this measures.
+        self._rerun("plain rerun")
+
+        trends = self.app.text_input(key="trend_keywords")
+        self._rerun("mention trends", lambda: trends.input(", ".join(self.rng.sample(COMPETITORS, 2))))
+
+    def run(self, iterations):
+        self.login()
+        if self.app.exception or not self.app.sidebar.selectbox:
+            self.errors.append("login did not reach the dashboard")
+            return self
+        for _ in range(iterations):
+            try:
+                self.browse()
+            except (StopIteration, IndexError, KeyError) as e:
+                self.errors.append(f"dashboard element missing: {e!r}")
+                break
+        return self
+
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def print_report(sessions, wall_time, rss_baseline, rss_loaded):
+    """Print the latency table and summary, returns the number of errors"""
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    for session in sessions:
+        for action, values in session.latencies.items():
+            latencies[action].extend(values)
+        for action, count in session.failures.items():
+            failures[action] += count
+            latencies.setdefault(action, [])
+    all_latencies = [v for values in latencies.values() for v in values]
+    failures["all"] = sum(failures.values())
+    errors = [f"session {s.session_id}: {e}" for s in sessions for e in s.errors]
+
+    print(f"\n{'Interaction':<22}{'Reruns':>8}{'Failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for action, values in list(latencies.items()) + [("all", all_latencies)]:
+        print(f"{action:<22}{len(values):>8}{failures[action]:>8}{percentile_ms(values, 50):>10.0f}"
+              f"{percentile_ms(values, 95):>10.0f}{percentile_ms(values, 100):>10.0f}")
+
+    print(f"\nSessions:             {len(sessions)}")
+    print(f"Wall time:            {wall_time:.1f}s")
+    print(f"Throughput:           {len(all_latencies) / wall_time:.1f} reruns/s")
+    print(f"RSS before sessions:  {rss_baseline:.0f} MB")
+    print(f"RSS with sessions:    {rss_loaded:.0f} MB")
+    print(f"RSS per session:      {(rss_loaded - rss_baseline) / max(len(sessions), 1):.1f} MB")
+    print(f"Errors:               {len(errors)}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    if errors:
+        print("\nRESULTS INVALID: sessions hit errors, latency and throughput above do not reflect capacity.")
+    return len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dashboard rerun latency and memory under concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=10, help="number of concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="browse passes per session after login")
+    parser.add_argument("--engagements", type=int, default=500, help="engagements served by the stub feed")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime.now() - timedelta(days=180)
+    engagements = [make_engagement(i, rng, start) for i in range(args.engagements)]
+    server, url = start_stub_feed(engagements)
+    os.environ["ENGAGEMENT_API_URL"] = url
+    print(f"Stub feed serving {len(engagements)} engagements at {url}")
+    try:
+        app_test_config = share_runtime_between_sessions()
+    except RuntimeError as e:
+        print(e)
+        server.shutdown()
+        return 1
+
+    # Warm the shared data cache and engagement index so sessions measure steady-state reruns
+    warmup = Session("warmup", args.timeout, random.Random(args.seed))
+    warmup.login()
+    if warmup.errors:
+        print(f"Warm-up failed: {warmup.errors[0]}")
+        server.shutdown()
+        return 1
+    del warmup
+    rss_baseline = current_rss_mb()
+
+    sessions = [Session(i, args.timeout, random.Random(args.seed + i + 1)) for i in range(args.sessions)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(lambda session: session.run(args.iterations), sessions))
+    wall_time = time.perf_counter() - started
+    rss_loaded = current_rss_mb()
+
+    error_count = print_report(sessions, wall_time, rss_baseline, rss_loaded)
+    app_test_config.__exit__(None, None, None)
+    server.shutdown()
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())